@@ -1,18 +1,54 @@
+import time
+
+# Record when the module started loading so startup costs can be reported
+_MODULE_START = time.perf_counter()
+
 import os
 import json
-import time
+import hashlib
 import random
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
 import requests
 from bs4 import BeautifulSoup
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, redirect, render_template, send_file
 from flask_cors import CORS
-import google.generativeai as genai
 from PIL import Image
 from urllib.parse import urlparse, parse_qs, quote_plus
 import re
-import cloudscraper
-from peerlist_selenium import PeerlistSelenium
 from dotenv import load_dotenv
+from goodreads_index import GoodreadsIndex, containment, normalize_text, title_forms, title_similarity
+from library_import import goodreads_url_for_row, iter_library_rows
+from shared_state import SingleFlight, create_backend
+from cover_cache import COVER_NAME_PATTERN, CoverCache
+from image_upload import (
+    ImageTooLargeError, RequestMemoryTracker, check_image_size, load_image_for_extraction,
+    make_request_class
+)
+
+# Heavy dependencies (google.generativeai, selenium and webdriver_manager)
+# are imported lazily by the getters below.
+
+# --- Startup Instrumentation ---
+STARTUP_TIMINGS = {}
+
+@contextmanager
+def timed_init(name):
+    """
+    Measure how long an import or initialization step takes and record it
+    in STARTUP_TIMINGS (milliseconds).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        STARTUP_TIMINGS[name] = round(elapsed_ms, 1)
+        print(f"⏱  {name}: {elapsed_ms:.1f} ms")
+
+STARTUP_TIMINGS['core_imports'] = round((time.perf_counter() - _MODULE_START) * 1000, 1)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -26,11 +62,25 @@ try:
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY environment variable not set.")
-    genai.configure(api_key=api_key)
 except ValueError as e:
     print(e)
     exit(1)
 
+_gemini_model = None
+_genai_lock = threading.Lock()
+
+def get_gemini_model():
+    """Import and configure Gemini on first use and return the shared model."""
+    global _gemini_model
+    if _gemini_model is None:
+        with _genai_lock:
+            if _gemini_model is None:
+                with timed_init('gemini_init'):
+                    import google.generativeai as genai
+                    genai.configure(api_key=api_key)
+                    _gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+    return _gemini_model
+
 # --- Peerlist Configuration ---
 PEERLIST_AUTHORIZATION = os.getenv("PEERLIST_AUTHORIZATION")
 PEERLIST_COLLECTION_ID = os.getenv("PEERLIST_COLLECTION_ID")
@@ -41,6 +91,45 @@ PEERLIST_USERNAME = os.getenv("PEERLIST_USERNAME")
 PEERLIST_IPV4 = os.getenv("PEERLIST_IPV4")
 PEERLIST_IPV6 = os.getenv("PEERLIST_IPV6")
 
+# Local Goodreads catalog used before any search engine is queried
+GOODREADS_INDEX_PATH = os.getenv("GOODREADS_INDEX_PATH", "goodreads_index.json")
+GOODREADS_INDEX_MIN_CONFIDENCE = float(os.getenv("GOODREADS_INDEX_MIN_CONFIDENCE", "0.85"))
+
+# Shared state (caches, rate limits, in-flight lookups) for multi-worker
+# deployments: a local SQLite file by default, or a redis:// URL
+SHARED_BACKEND_URL = os.getenv("SHARED_BACKEND_URL", "")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+URL_CACHE_TTL = int(os.getenv("URL_CACHE_TTL", str(30 * 24 * 3600)))
+URL_MISS_TTL = int(os.getenv("URL_MISS_TTL", str(6 * 3600)))
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", str(7 * 24 * 3600)))
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(24 * 3600)))
+
+# Minimum and maximum seconds between requests to each upstream provider,
+# shared by all workers
+PROVIDER_INTERVALS = {
+    'google': (2, 4),
+    'duckduckgo': (2, 4),
+    'goodreads': (1, 2),
+    'peerlist': (1, 1),
+}
+
+# Local cache of resized cover images served at /covers/<digest>.jpg
+COVER_CACHE_DIR = os.getenv("COVER_CACHE_DIR", "cover_cache")
+COVER_MAX_SIDE = int(os.getenv("COVER_MAX_SIDE", "300"))
+COVER_CACHE_TTL = int(os.getenv("COVER_CACHE_TTL", str(30 * 24 * 3600)))
+COVER_MISS_TTL = 3600
+
+# Upload limits: request size, in-memory buffering before spooling to disk,
+# decoded pixel count, and the resolution images are reduced to for Gemini
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "25"))
+MAX_IMPORT_MB = int(os.getenv("MAX_IMPORT_MB", "200"))
+UPLOAD_SPOOL_KB = int(os.getenv("UPLOAD_SPOOL_KB", "512"))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(64 * 1024 * 1024)))
+MAX_EXTRACTION_SIDE = int(os.getenv("MAX_EXTRACTION_SIDE", "3072"))
+
+# Warm up Gemini and the browser in the background once the server starts
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() in ("1", "true", "yes")
+
 # Auto-detect IP addresses if not provided
 def get_public_ip():
     """Get public IP address if not set in environment."""
@@ -50,12 +139,22 @@ def get_public_ip():
     except:
         return None
 
-if not PEERLIST_IPV4:
-    detected_ip = get_public_ip()
+def detect_public_ip():
+    """Fill in PEERLIST_IPV4 from the public IP lookup if it was not configured."""
+    global PEERLIST_IPV4
+    if PEERLIST_IPV4:
+        return
+    with timed_init('public_ip_probe'):
+        detected_ip = get_public_ip()
     if detected_ip:
         PEERLIST_IPV4 = detected_ip
         print(f"Auto-detected IPv4: {PEERLIST_IPV4}")
 
+# Apply upload limits
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
+app.request_class = make_request_class(UPLOAD_SPOOL_KB * 1024)
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
 # Validate required environment variables
 if not PEERLIST_AUTHORIZATION:
     print("Warning: PEERLIST_AUTHORIZATION environment variable not set.")
@@ -66,29 +165,126 @@ if not PEERLIST_COOKIES:
 if not PEERLIST_USERNAME:
     print("Warning: PEERLIST_USERNAME environment variable not set.")
 
-# Initialize Cloudscraper session
-scraper = cloudscraper.create_scraper(
-    browser={
-        'browser': 'chrome',
-        'platform': 'linux',
-        'desktop': True
-    }
-)
-
-# Initialize Selenium Peerlist client
+# Selenium Peerlist client (created on first use or by the warm-up thread)
 peerlist_selenium = None
+_selenium_lock = threading.Lock()
+
+# The browser can only drive one page at a time; concurrent requests take turns
+selenium_call_lock = threading.Lock()
 
 def get_peerlist_selenium():
     """Get or create the Selenium Peerlist client."""
     global peerlist_selenium
     if peerlist_selenium is None:
-        peerlist_selenium = PeerlistSelenium()
-        # Login to Peerlist
-        if not peerlist_selenium.login_to_peerlist(PEERLIST_COOKIES):
-            print("❌ Failed to login to Peerlist with Selenium")
-            return None
+        with _selenium_lock:
+            if peerlist_selenium is None:
+                with timed_init('selenium_init'):
+                    from peerlist_selenium import PeerlistSelenium
+                    client = PeerlistSelenium()
+                    # Login to Peerlist
+                    if not client.login_to_peerlist(PEERLIST_COOKIES):
+                        print("❌ Failed to login to Peerlist with Selenium")
+                        client.close()
+                        return None
+                peerlist_selenium = client
     return peerlist_selenium
 
+# Local Goodreads index (loaded on first use)
+goodreads_index = None
+_goodreads_index_lock = threading.Lock()
+
+def get_goodreads_index():
+    """Get or load the local Goodreads catalog index."""
+    global goodreads_index
+    if goodreads_index is None:
+        with _goodreads_index_lock:
+            if goodreads_index is None:
+                with timed_init('goodreads_index_load'):
+                    goodreads_index = GoodreadsIndex(GOODREADS_INDEX_PATH)
+    return goodreads_index
+
+# Shared backend (created on first use)
+shared_backend = None
+_shared_backend_lock = threading.Lock()
+
+def get_shared_backend():
+    """Get or create the cross-process shared backend."""
+    global shared_backend
+    if shared_backend is None:
+        with _shared_backend_lock:
+            if shared_backend is None:
+                with timed_init('shared_backend_init'):
+                    shared_backend = create_backend(SHARED_BACKEND_URL, SHARED_STATE_PATH)
+    return shared_backend
+
+def rate_limit(provider):
+    """Wait for this provider's shared rate-limit slot before calling it."""
+    low, high = PROVIDER_INTERVALS[provider]
+    get_shared_backend().wait_for_slot(provider, random.uniform(low, high))
+
+# In-process single-flight groups: concurrent requests for the same key
+# share one call (and one shared-backend claim) instead of each making it
+url_flight = SingleFlight()
+metadata_flight = SingleFlight()
+extraction_flight = SingleFlight()
+cover_flight = SingleFlight()
+
+def lookup_key(title, author):
+    """Normalized cache key for a (title, author) lookup."""
+    return f"{normalize_text(title)}|{normalize_text(author)}"
+
+# Cover cache (created on first use)
+cover_cache = None
+_cover_cache_lock = threading.Lock()
+
+def get_cover_cache():
+    """Get or create the local cover image cache."""
+    global cover_cache
+    if cover_cache is None:
+        with _cover_cache_lock:
+            if cover_cache is None:
+                cover_cache = CoverCache(COVER_CACHE_DIR, COVER_MAX_SIDE)
+    return cover_cache
+
+def local_cover_url(image_url):
+    """
+    Return the local URL of a cached thumbnail for a cover image, fetching
+    and storing it the first time. Returns None if it cannot be cached.
+    """
+    if not image_url:
+        return None
+    cache = get_cover_cache()
+    backend = get_shared_backend()
+    digest = cover_flight.do(image_url, lambda: backend.cached_call(
+        'cover', image_url,
+        lambda: cache.fetch(image_url),
+        ttl=COVER_CACHE_TTL, negative_ttl=COVER_MISS_TTL
+    ))
+    if digest and not cache.has(digest):
+        # The file was removed (or was stored by a worker on another host)
+        digest = cache.fetch(image_url)
+        if digest:
+            backend.set('cover', image_url, digest, COVER_CACHE_TTL)
+    return f"/covers/{digest}.jpg" if digest else None
+
+def warm_up():
+    """
+    Run the slow initialization steps (IP probe, Gemini, browser login) so
+    the first real request does not pay for them.
+    """
+    detect_public_ip()
+    for name, init in (('gemini', get_gemini_model), ('selenium', get_peerlist_selenium)):
+        try:
+            init()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+
+def start_background_warmup():
+    """Start warm_up() in a daemon thread."""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
 def parse_cookies(cookie_string):
     """
     Parse cookie string into a dictionary, handling cookies with values containing '='.
@@ -113,9 +309,113 @@ def parse_cookies(cookie_string):
     
     return cookies
 
+# Search results scoring below this are treated as "not found" so the next
+# search engine gets a chance instead of adding the wrong book
+MIN_CANDIDATE_SCORE = 0.5
+
+# Words that usually mark companion books rather than the book itself
+COMPANION_BOOK_WORDS = ('summary', 'study guide', 'workbook', 'analysis', 'sparknotes', 'boxed set', 'box set')
+
+class SearchUnavailable(Exception):
+    """
+    A search could not be completed (blocked, rate limited, timed out).
+    Unlike a search that finds nothing, this must not be cached as a miss.
+    """
+
+def canonical_goodreads_url(url):
+    """
+    Strip query strings and fragments from a Goodreads /book/show/ URL.
+    Returns None if the URL is not a Goodreads book page.
+    """
+    if not url:
+        return None
+    match = re.search(r'goodreads\.com(/book/show/\d+[^?#&\s]*)', url)
+    if not match:
+        return None
+    return f"https://www.goodreads.com{match.group(1)}"
+
+def result_title(text, author):
+    """
+    Guess the book title in a search result's text, e.g. "Shoe Dog: A Memoir
+    by the Creator of Nike" from "Shoe Dog: A Memoir by the Creator of Nike
+    by Phil Knight | Goodreads". The title ends at the last " by " that is
+    still followed by the author.
+    """
+    text = ' '.join(text.split('|', 1)[0].split())
+    parts = text.split(' by ')
+    norm_author = normalize_text(author)
+    if norm_author:
+        for k in range(len(parts) - 1, 0, -1):
+            if containment(norm_author, normalize_text(' by '.join(parts[k:]))) >= 0.6:
+                return ' by '.join(parts[:k])
+    return parts[0]
+
+def score_candidate(title, author, url, text):
+    """
+    Score a search-result link against the book we are looking for, using
+    the title in the result text and the title slug in the URL. Titles are
+    compared symmetrically, so extra words ("Dune Messiah" for "Dune") lower
+    the score. Returns a value in [0, 1].
+    """
+    norm_title = normalize_text(title)
+    norm_author = normalize_text(author)
+    norm_text = normalize_text(text)
+
+    slug_match = re.search(r'/book/show/\d+[-.]([^/?#]+)', url)
+    slug = normalize_text(slug_match.group(1).replace('_', ' ')) if slug_match else ""
+
+    query_forms = title_forms(title)
+    candidate_title = result_title(text, author)
+    title_score = max(
+        title_similarity(query_forms, title_forms(candidate_title)),
+        title_similarity(query_forms, (slug, slug))
+    )
+    if not normalize_text(candidate_title) and not slug:
+        # Nothing to compare against; fall back to the query appearing anywhere
+        title_score = 0.8 * containment(norm_title, norm_text)
+    if norm_author and norm_text:
+        score = 0.75 * title_score + 0.25 * containment(norm_author, norm_text)
+    else:
+        score = title_score
+
+    # Penalize summaries, study guides etc. unless they were asked for
+    lowered = f"{text} {slug}".lower()
+    requested = (title or "").lower()
+    if any(word in lowered and word not in requested for word in COMPANION_BOOK_WORDS):
+        score *= 0.5
+    return score
+
+def pick_best_candidate(title, author, candidates, source):
+    """
+    Rank (url, text) candidates from one results page and return the best
+    scoring URL, or None if no candidate is a convincing match.
+    Earlier results win ties.
+    """
+    merged = {}
+    for url, text in candidates:
+        url = canonical_goodreads_url(url)
+        if not url:
+            continue
+        merged[url] = f"{merged.get(url, '')} {text}".strip()
+
+    best_url, best_score = None, 0.0
+    for url, text in merged.items():
+        score = score_candidate(title, author, url, text)
+        print(f"    > Candidate ({score:.2f}): {url}")
+        if score > best_score:
+            best_url, best_score = url, score
+
+    if best_url and best_score >= MIN_CANDIDATE_SCORE:
+        print(f"    > Best Goodreads URL ({source}, score {best_score:.2f}): {best_url}")
+        return best_url
+    if merged:
+        print(f"    > No {source} candidate matched well enough (best score {best_score:.2f})")
+    return None
+
 def search_goodreads_direct_simple(title, author):
     """
     Direct Goodreads search as fallback when Google/DuckDuckGo fail.
+    Returns the best matching book on the results page.
     """
     try:
         # Create search query
@@ -138,31 +438,41 @@ def search_goodreads_direct_simple(title, author):
             'Upgrade-Insecure-Requests': '1',
         }
         
+        rate_limit('goodreads')
+        
         response = requests.get(search_url, headers=headers, timeout=15)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
         
-        # Look for book links in search results
+        # Collect every book link, scored with the text of its result row
+        candidates = []
         for link in soup.find_all('a', href=re.compile(r'/book/show/\d+')):
             href = link.get('href')
             if href:
                 if not href.startswith('http'):
                     href = f"https://www.goodreads.com{href}"
-                
-                print(f"    > Found Goodreads URL (direct): {href}")
-                return href
+                row = link.find_parent('tr')
+                text = row.get_text(' ') if row else link.get_text(' ')
+                candidates.append((href, text))
         
-        print(f"    > No book links found on Goodreads search page")
+        if not candidates:
+            print(f"    > No book links found on Goodreads search page")
+            return None
         
+        return pick_best_candidate(title, author, candidates, 'Goodreads')
+        
+    except SearchUnavailable:
+        raise
     except Exception as e:
         print(f"    > Direct Goodreads search failed: {e}")
+        raise SearchUnavailable(f"Direct Goodreads search failed: {e}") from e
     
     return None
 
 def search_google_simple(title, author):
     """
-    Simple Google search: "title by author goodreads" and get first Goodreads link.
+    Simple Google search: "title by author goodreads" and get the best matching Goodreads link.
     """
     try:
         # Create search query in the exact format that works: "title" by author goodreads
@@ -191,8 +501,8 @@ def search_google_simple(title, author):
             'Cache-Control': 'max-age=0',
         }
         
-        # Add a small delay to avoid rate limiting
-        time.sleep(1)
+        # Wait for the shared Google rate limit
+        rate_limit('google')
         
         response = requests.get(search_url, headers=headers, timeout=15)
         response.raise_for_status()
@@ -200,7 +510,7 @@ def search_google_simple(title, author):
         # Check if we got blocked
         if 'enablejs' in response.text or 'support.google.com' in response.text:
             print(f"    > Google blocked the request, trying alternative method...")
-            return None
+            raise SearchUnavailable("Google blocked the request")
         
         soup = BeautifulSoup(response.text, 'html.parser')
         
@@ -209,36 +519,36 @@ def search_google_simple(title, author):
         for link in soup.find_all('a'):
             href = link.get('href')
             if href and 'goodreads.com/book/show' in href:
-                found_links.append(href)
                 print(f"    > Found Goodreads link: {href}")
                 
-                if href.startswith('/url?q=https://www.goodreads.com/book/show'):
+                if href.startswith('/url?q='):
                     # Extract the actual URL from Google's redirect
                     parsed_url = urlparse(href)
-                    actual_url = parse_qs(parsed_url.query).get('q', [None])[0]
-                    if actual_url:
-                        print(f"    > Extracted URL: {actual_url}")
-                        return actual_url
-                elif href.startswith('https://www.goodreads.com/book/show'):
-                    print(f"    > Direct Goodreads URL: {href}")
-                    return href
-        
-        if not found_links:
-            print(f"    > No Goodreads links found in Google results")
-            # Print first few links to debug
-            all_links = soup.find_all('a', href=True)
-            print(f"    > First 5 links found:")
-            for i, link in enumerate(all_links[:5]):
-                print(f"      {i+1}. {link.get('href')}")
+                    href = parse_qs(parsed_url.query).get('q', [None])[0]
+                if href:
+                    found_links.append((href, link.get_text(' ')))
+        
+        if found_links:
+            return pick_best_candidate(title, author, found_links, 'Google')
+        
+        print(f"    > No Goodreads links found in Google results")
+        # Print first few links to debug
+        all_links = soup.find_all('a', href=True)
+        print(f"    > First 5 links found:")
+        for i, link in enumerate(all_links[:5]):
+            print(f"      {i+1}. {link.get('href')}")
                     
+    except SearchUnavailable:
+        raise
     except Exception as e:
         print(f"    > Google search failed: {e}")
+        raise SearchUnavailable(f"Google search failed: {e}") from e
     
     return None
 
 def search_duckduckgo_simple(title, author):
     """
-    Simple DuckDuckGo search: "title by author goodreads" and get first Goodreads link.
+    Simple DuckDuckGo search: "title by author goodreads" and get the best matching Goodreads link.
     """
     try:
         # Create search query in the exact format that works: "title" by author goodreads
@@ -266,8 +576,8 @@ def search_duckduckgo_simple(title, author):
             'Sec-Fetch-User': '?1',
         }
         
-        # Add a small delay to avoid rate limiting
-        time.sleep(1)
+        # Wait for the shared DuckDuckGo rate limit
+        rate_limit('duckduckgo')
         
         response = requests.get(search_url, headers=headers, timeout=15)
         response.raise_for_status()
@@ -278,57 +588,92 @@ def search_duckduckgo_simple(title, author):
         found_links = []
         for link in soup.find_all('a'):
             href = link.get('href')
-            if href and 'goodreads.com/book/show' in href:
-                found_links.append(href)
+            if not href:
+                continue
+            
+            # DuckDuckGo uses redirect URLs, extract the actual URL
+            if '/l/?' in href and 'uddg=' in href:
+                href = parse_qs(urlparse(href).query).get('uddg', [href])[0]
+            
+            if 'goodreads.com/book/show' in href:
                 print(f"    > Found Goodreads link: {href}")
-                
-                # DuckDuckGo uses redirect URLs, extract the actual URL
-                if href.startswith('/l/?uddg='):
-                    # Extract the actual URL from DuckDuckGo's redirect
-                    actual_url = href.split('/l/?uddg=')[1]
-                    if actual_url:
-                        print(f"    > Extracted URL: {actual_url}")
-                        return actual_url
-                elif href.startswith('https://www.goodreads.com'):
-                    print(f"    > Direct Goodreads URL: {href}")
-                    return href
-        
-        if not found_links:
-            print(f"    > No Goodreads links found in DuckDuckGo results")
-            # Print first few links to debug
-            all_links = soup.find_all('a', href=True)
-            print(f"    > First 5 links found:")
-            for i, link in enumerate(all_links[:5]):
-                print(f"      {i+1}. {link.get('href')}")
+                found_links.append((href, link.get_text(' ')))
+        
+        if found_links:
+            return pick_best_candidate(title, author, found_links, 'DuckDuckGo')
+        
+        print(f"    > No Goodreads links found in DuckDuckGo results")
+        # Print first few links to debug
+        all_links = soup.find_all('a', href=True)
+        print(f"    > First 5 links found:")
+        for i, link in enumerate(all_links[:5]):
+            print(f"      {i+1}. {link.get('href')}")
                     
+    except SearchUnavailable:
+        raise
     except Exception as e:
         print(f"    > DuckDuckGo search failed: {e}")
+        raise SearchUnavailable(f"DuckDuckGo search failed: {e}") from e
     
     return None
 
 def get_goodreads_url(title, author):
     """
-    Simple and reliable method: search for "book title goodreads" and get the first result.
+    Resolve a book to its Goodreads URL, using the local index first and
+    falling back to searching for "book title goodreads".
     """
     if not title or title == "Unknown":
         return None  # Cannot search without a title
 
-    print(f"Searching for: \"{title}\" by {author}")
-    
-    # Method 1: Try Google search for "title goodreads"
-    url = search_google_simple(title, author)
-    if url:
+    # Method 0: Check the local Goodreads index before touching the network
+    index = get_goodreads_index()
+    url, confidence = index.lookup(title, author)
+    if url and confidence >= GOODREADS_INDEX_MIN_CONFIDENCE:
+        print(f"  > Found in local index (confidence {confidence}): {url}")
         return url
-    
-    # Method 2: Try DuckDuckGo as fallback
-    url = search_duckduckgo_simple(title, author)
+
+    # Share search results between workers and collapse concurrent
+    # searches for the same book into one upstream call
+    # Only searches that completed without a match are cached as misses;
+    # SearchUnavailable is never cached
+    key = lookup_key(title, author)
+    try:
+        url = url_flight.do(key, lambda: get_shared_backend().cached_call(
+            'goodreads_url', key,
+            lambda: search_goodreads_url(title, author),
+            ttl=URL_CACHE_TTL, negative_ttl=URL_MISS_TTL
+        ))
+    except SearchUnavailable as e:
+        print(f"  > No Goodreads URL found for '{title}' by {author} ({e})")
+        return None
     if url:
-        return url
+        index.add(title, author, url)
+    return url
+
+def search_goodreads_url(title, author):
+    """
+    Run the search-engine chain (Google, DuckDuckGo, Goodreads) for a book.
+    """
+    print(f"Searching for: \"{title}\" by {author}")
     
-    # Method 3: Try direct Goodreads search as last resort
-    url = search_goodreads_direct_simple(title, author)
-    if url:
-        return url
+    # Try Google first, then DuckDuckGo, then direct Goodreads search
+    unavailable = []
+    for name, search in (
+        ('Google', search_google_simple),
+        ('DuckDuckGo', search_duckduckgo_simple),
+        ('Goodreads', search_goodreads_direct_simple),
+    ):
+        try:
+            url = search(title, author)
+        except SearchUnavailable:
+            unavailable.append(name)
+            continue
+        if url:
+            return url
+    
+    if unavailable:
+        # Some engines never answered, so this is not a confirmed miss
+        raise SearchUnavailable(f"{', '.join(unavailable)} unavailable")
     
     print(f"  > No Goodreads URL found for '{title}' by {author}")
     return None
@@ -345,6 +690,7 @@ def get_book_metadata_from_goodreads(goodreads_url):
             'Accept-Language': 'en-US,en;q=0.5',
         }
         
+        rate_limit('goodreads')
         response = requests.get(goodreads_url, headers=headers, timeout=10)
         response.raise_for_status()
         
@@ -383,7 +729,48 @@ def get_book_metadata_from_goodreads(goodreads_url):
         print(f"    > Error extracting from Goodreads: {e}")
         return None
 
+def metadata_key(goodreads_url):
+    """Cache key for a book's metadata."""
+    return canonical_goodreads_url(goodreads_url) or goodreads_url
+
+def cached_cover_image(goodreads_url):
+    """
+    Original cover image URL of a book whose metadata is already cached,
+    without fetching metadata. Returns None otherwise.
+    """
+    hit, metadata = get_shared_backend().get('metadata', metadata_key(goodreads_url))
+    if not hit or not metadata:
+        return None
+    return metadata.get('image') or None
+
+def cover_link(goodreads_url):
+    """
+    URL the frontend should load a book's cover from, without downloading
+    anything: the stored thumbnail if we already have it, otherwise /cover,
+    which fetches it when the browser first asks. None if the book's
+    metadata is not cached.
+    """
+    image_url = cached_cover_image(goodreads_url)
+    if not image_url:
+        return None
+    hit, digest = get_shared_backend().get('cover', image_url)
+    if hit and digest and get_cover_cache().has(digest):
+        return f"/covers/{digest}.jpg"
+    return f"/cover?goodreads_url={quote_plus(goodreads_url)}"
+
 def get_peerlist_metadata(goodreads_url):
+    """
+    Get book metadata for a Goodreads URL, shared between workers through
+    the metadata cache.
+    """
+    key = metadata_key(goodreads_url)
+    return metadata_flight.do(key, lambda: get_shared_backend().cached_call(
+        'metadata', key,
+        lambda: fetch_peerlist_metadata(goodreads_url),
+        ttl=METADATA_CACHE_TTL, negative_ttl=0
+    ))
+
+def fetch_peerlist_metadata(goodreads_url):
     """
     Get book metadata from Peerlist API using Selenium to bypass Cloudflare.
     """
@@ -395,7 +782,8 @@ def get_peerlist_metadata(goodreads_url):
             return None
         
         # Use Selenium to get metadata
-        metadata = selenium_client.get_book_metadata(goodreads_url)
+        with selenium_call_lock:
+            metadata = selenium_client.get_book_metadata(goodreads_url)
         
         # If Peerlist fails, try direct Goodreads extraction
         if not metadata:
@@ -409,6 +797,58 @@ def get_peerlist_metadata(goodreads_url):
         # Try direct Goodreads extraction as fallback
         return get_book_metadata_from_goodreads(goodreads_url)
 
+def resolve_goodreads_redirect(goodreads_url):
+    """
+    Follow Goodreads redirects (e.g. /book/isbn/<isbn> -> /book/show/<id>)
+    and return the canonical book URL, or None if it does not resolve.
+    """
+    try:
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+        }
+        rate_limit('goodreads')
+        response = requests.get(goodreads_url, headers=headers, timeout=10, stream=True)
+        response.close()
+        return canonical_goodreads_url(response.url)
+    except Exception as e:
+        print(f"    > Could not resolve {goodreads_url}: {e}")
+        return None
+
+def add_book_from_goodreads_url(title, author, goodreads_url):
+    """
+    Fetch metadata for a Goodreads URL and add the book to the Peerlist
+    collection. Returns (success, cover URL for the frontend or None).
+    """
+    print(f"Processing book for Peerlist: {title} by {author}")
+    
+    # Get metadata from Peerlist API using Selenium
+    metadata = get_peerlist_metadata(goodreads_url)
+    if not metadata:
+        print(f"Failed to get metadata for {title}")
+        return False, None
+
+    # Prepare book data for Peerlist
+    book_data = {
+        'title': metadata.get('title', title),
+        'author': metadata.get('author', [author])[0] if isinstance(metadata.get('author'), list) else metadata.get('author', author),
+        'image': metadata.get('image', ''),
+        'description': metadata.get('description', ''),
+        'url': goodreads_url
+    }
+
+    # Be respectful with API calls
+    rate_limit('peerlist')
+
+    # Add to Peerlist collection using Selenium
+    success, item_id = add_book_to_peerlist_collection(book_data)
+    if success:
+        print(f"Successfully added {title} to Peerlist (ID: {item_id})")
+    else:
+        print(f"Failed to add {title} to Peerlist")
+    # Peerlist needs the original public image URL; the local thumbnail is
+    # only for our frontend and is fetched when the browser first asks
+    return success, cover_link(goodreads_url)
+
 def add_book_to_peerlist_collection(book_data):
     """
     Add a book to the Peerlist collection using Selenium.
@@ -421,9 +861,10 @@ def add_book_to_peerlist_collection(book_data):
             return False, None
         
         # Use Selenium to add book to collection
-        success = selenium_client.add_book_to_collection(book_data, PEERLIST_COLLECTION_ID)
+        with selenium_call_lock:
+            success, item_id = selenium_client.add_book_to_collection(book_data, PEERLIST_COLLECTION_ID)
         if success:
-            return True, "added_via_selenium"
+            return True, item_id or "added_via_selenium"
         else:
             return False, None
             
@@ -438,6 +879,53 @@ def index():
     """Serves the main HTML page."""
     return render_template('index.html')
 
+def file_digest(stream):
+    """SHA-256 of an uploaded file's contents, leaving the stream rewound."""
+    sha = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        sha.update(chunk)
+    stream.seek(0)
+    return sha.hexdigest()
+
+def extract_books_with_gemini(image_stream):
+    """
+    Ask Gemini for the titles and authors of the books in an image.
+    """
+    image = load_image_for_extraction(image_stream, MAX_EXTRACTION_SIDE)
+    model = get_gemini_model()
+    
+    prompt = """
+    Analyze this image of a bookshelf. Identify each book. For each one, extract its title and author.
+    Return the result ONLY as a valid JSON array of objects. Each object must have a "title" and "author" key.
+    If a title or author is unreadable or not visible, use the string "Unknown".
+    Do not include any text or markdown formatting before or after the JSON array.
+    Example: [{"title": "Shoe Dog", "author": "Phil Knight"}, {"title": "The Silent Patient", "author": "Alex Michaelides"}]
+    """
+
+    response = model.generate_content([prompt, image])
+    
+    # Clean up the response to get pure JSON
+    cleaned_text = response.text.strip().replace("```json", "").replace("```", "")
+    return json.loads(cleaned_text)
+
+def report_upload_memory(response, tracker):
+    """
+    Log the peak memory reached while handling this upload and add it to
+    the response headers.
+    """
+    if tracker.peak_delta_mb is not None:
+        response.headers['X-Peak-RSS-Delta-MB'] = f"{tracker.peak_delta_mb:.1f}"
+    if tracker.peak_mb is not None:
+        response.headers['X-Peak-RSS-MB'] = f"{tracker.peak_mb:.1f}"
+    print(f"    > Upload memory: peak {response.headers.get('X-Peak-RSS-MB', 'n/a')} MB, "
+          f"{response.headers.get('X-Peak-RSS-Delta-MB', 'n/a')} MB above the start of the request")
+
+@app.errorhandler(413)
+def request_too_large(e):
+    """Return a JSON error when an upload exceeds the request size limit."""
+    limit_mb = (request.max_content_length or 0) // (1024 * 1024)
+    return jsonify({"error": f"Upload too large (limit {limit_mb} MB)"}), 413
+
 @app.route('/extract_books', methods=['POST'])
 def extract_books_from_image():
     """
@@ -452,24 +940,27 @@ def extract_books_from_image():
         return jsonify({"error": "No selected file"}), 400
 
     try:
-        image = Image.open(file.stream)
-        model = genai.GenerativeModel('gemini-1.5-flash') 
-        
-        prompt = """
-        Analyze this image of a bookshelf. Identify each book. For each one, extract its title and author.
-        Return the result ONLY as a valid JSON array of objects. Each object must have a "title" and "author" key.
-        If a title or author is unreadable or not visible, use the string "Unknown".
-        Do not include any text or markdown formatting before or after the JSON array.
-        Example: [{"title": "Shoe Dog", "author": "Phil Knight"}, {"title": "The Silent Patient", "author": "Alex Michaelides"}]
-        """
+        # Reject decompression bombs from the header, before decoding anything
+        check_image_size(file.stream, MAX_IMAGE_PIXELS)
+    except (ImageTooLargeError, Image.DecompressionBombError) as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        print(f"    > Could not read uploaded image {file.filename}: {e}")
+        return jsonify({"error": "Could not read image: unsupported or corrupt image file."}), 400
 
-        response = model.generate_content([prompt, image])
-        
-        # Clean up the response to get pure JSON
-        cleaned_text = response.text.strip().replace("```json", "").replace("```", "")
-        books = json.loads(cleaned_text)
+    try:
+        # Identical photos uploaded at the same time share one Gemini call
+        digest = file_digest(file.stream)
+        with RequestMemoryTracker() as tracker:
+            books = extraction_flight.do(digest, lambda: get_shared_backend().cached_call(
+                'books_from_image', digest,
+                lambda: extract_books_with_gemini(file.stream),
+                ttl=EXTRACTION_CACHE_TTL, negative_ttl=0
+            ))
         
-        return jsonify(books)
+        response = jsonify(books)
+        report_upload_memory(response, tracker)
+        return response
 
     except Exception as e:
         print(f"An error occurred during extraction: {e}")
@@ -494,11 +985,10 @@ def find_goodreads_urls():
         updated_book = {
             "title": book.get('title', 'Unknown'),
             "author": book.get('author', 'Unknown'),
-            "goodreads_url": url or "Not Found"
+            "goodreads_url": url or "Not Found",
+            "cover_url": cover_link(url) if url else None
         }
         books_with_urls.append(updated_book)
-        
-        time.sleep(random.randint(2, 4)) 
     
     return jsonify(books_with_urls)
 
@@ -513,46 +1003,181 @@ def add_to_peerlist():
 
     added_count = 0
     failed_books = []
+    covers = {}
 
     for book in books:
         if not book.get('goodreads_url') or book.get('goodreads_url') == 'Not Found':
             continue
 
-        print(f"Processing book for Peerlist: {book['title']} by {book['author']}")
-        
-        # Get metadata from Peerlist API using Selenium
-        metadata = get_peerlist_metadata(book['goodreads_url'])
-        if not metadata:
-            print(f"Failed to get metadata for {book['title']}")
-            failed_books.append(book['title'])
-            continue
-
-        # Prepare book data for Peerlist
-        book_data = {
-            'title': metadata.get('title', book['title']),
-            'author': metadata.get('author', [book['author']])[0] if isinstance(metadata.get('author'), list) else metadata.get('author', book['author']),
-            'image': metadata.get('image', ''),
-            'description': metadata.get('description', ''),
-            'url': book['goodreads_url']
-        }
-
-        # Add to Peerlist collection using Selenium
-        success, item_id = add_book_to_peerlist_collection(book_data)
+        success, cover_url = add_book_from_goodreads_url(book['title'], book['author'], book['goodreads_url'])
         if success:
             added_count += 1
-            print(f"Successfully added {book['title']} to Peerlist (ID: {item_id})")
         else:
             failed_books.append(book['title'])
-            print(f"Failed to add {book['title']} to Peerlist")
-
-        # Be respectful with API calls
-        time.sleep(1)
+        if cover_url:
+            covers[book['goodreads_url']] = cover_url
 
     return jsonify({
         "success": True,
         "added_count": added_count,
         "total_books": len(books),
-        "failed_books": failed_books
+        "failed_books": failed_books,
+        "covers": covers
+    })
+
+@app.route('/import_library', methods=['POST'])
+def import_library():
+    """
+    Bulk import from a Goodreads library export or any CSV/JSON list of
+    Goodreads URLs, book IDs or ISBNs. Rows are streamed one at a time and
+    skip image extraction and search entirely; progress is streamed back
+    as one JSON object per line.
+    Optional form field "shelf" limits a Goodreads export to one shelf.
+    """
+    # Library exports may be larger than photos
+    request.max_content_length = MAX_IMPORT_MB * 1024 * 1024
+
+    if 'file' not in request.files:
+        return jsonify({"error": "No file part"}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    shelf = request.form.get('shelf')
+    filename = file.filename
+    index = get_goodreads_index()
+
+    # Copy the upload into a temporary file owned by the response, so the
+    # import does not depend on the request's upload staying open
+    upload = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.stream, upload)
+    upload.seek(0)
+
+    def import_row(row, title, author):
+        """Resolve one row and add it. Returns (goodreads_url, cover_url, status)."""
+        goodreads_url = goodreads_url_for_row(row)
+        if not goodreads_url:
+            return None, None, "skipped"
+        if not row.get('book_id'):
+            # An ISBN that does not resolve (unknown, rate limited, network
+            # error) is a failure, not a row without an ID
+            resolved_url = resolve_goodreads_redirect(goodreads_url)
+            if not resolved_url:
+                return goodreads_url, None, "failed"
+            goodreads_url = resolved_url
+
+        if row.get('title'):
+            index.add(title, author, goodreads_url, persist=False)
+
+        success, cover_url = add_book_from_goodreads_url(title, author, goodreads_url)
+        return goodreads_url, cover_url, "added" if success else "failed"
+
+    def generate():
+        added_count = 0
+        skipped_count = 0
+        failed_books = []
+        total = 0
+        error = None
+
+        try:
+            for row in iter_library_rows(upload, filename):
+                if shelf and row.get('shelf') and row['shelf'] != shelf:
+                    continue
+                total += 1
+                title = row.get('title', 'Unknown')
+                author = row.get('author', 'Unknown')
+
+                try:
+                    goodreads_url, cover_url, status = import_row(row, title, author)
+                except Exception as e:
+                    print(f"Error importing row {total} ({title}): {e}")
+                    goodreads_url, cover_url, status = None, None, "failed"
+
+                if status == "added":
+                    added_count += 1
+                elif status == "skipped":
+                    skipped_count += 1
+                else:
+                    failed_books.append(title if row.get('title') else (goodreads_url or f"row {total}"))
+
+                yield json.dumps({
+                    "row": total,
+                    "title": title,
+                    "goodreads_url": goodreads_url,
+                    "cover_url": cover_url,
+                    "status": status
+                }) + "\n"
+        except Exception as e:
+            # Malformed JSON, text that is not UTF-8, oversized CSV fields...
+            error = f"Could not read the file after {total} books: {e}"
+            print(error)
+            yield json.dumps({"error": error}) + "\n"
+        finally:
+            upload.close()
+            # Keep everything imported so far, even if the import stopped early
+            index.save()
+
+        yield json.dumps({
+            "success": error is None,
+            "error": error,
+            "added_count": added_count,
+            "skipped_count": skipped_count,
+            "total_books": total,
+            "failed_books": failed_books
+        }) + "\n"
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    # Also release the upload if the client disconnects before streaming starts
+    response.call_on_close(upload.close)
+    return response
+
+@app.route('/cover', methods=['GET'])
+def cover_for_book():
+    """
+    Redirect to the cached thumbnail of a book's cover, downloading it the
+    first time it is requested.
+    """
+    goodreads_url = request.args.get('goodreads_url', '')
+    cover_url = local_cover_url(cached_cover_image(goodreads_url)) if goodreads_url else None
+    if not cover_url:
+        return jsonify({"error": "Cover not found"}), 404
+    return redirect(cover_url)
+
+@app.route('/covers/<name>', methods=['GET'])
+def serve_cover(name):
+    """
+    Serve a cached cover thumbnail. Names are content hashes, so a given
+    URL never changes and can be cached by browsers indefinitely.
+    """
+    cache = get_cover_cache()
+    if not COVER_NAME_PATTERN.match(name) or not cache.has(name[:-len('.jpg')]):
+        return jsonify({"error": "Cover not found"}), 404
+
+    digest = name[:-len('.jpg')]
+    response = send_file(cache.path_for(digest), mimetype='image/jpeg', etag=digest, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/startup_stats', methods=['GET'])
+def startup_stats():
+    """
+    Report import and initialization costs, and which lazy components are ready.
+    """
+    return jsonify({
+        "timings_ms": STARTUP_TIMINGS,
+        "initialized": {
+            "gemini": _gemini_model is not None,
+            "selenium": peerlist_selenium is not None,
+            "goodreads_index": goodreads_index is not None,
+            "shared_backend": shared_backend is not None,
+        },
+        "coalesced_calls": {
+            "goodreads_url": url_flight.coalesced,
+            "metadata": metadata_flight.coalesced,
+            "extraction": extraction_flight.coalesced,
+        },
+        "goodreads_index_size": len(goodreads_index) if goodreads_index is not None else 0
     })
 
 @app.route('/test_selenium', methods=['GET'])
@@ -581,7 +1206,16 @@ def test_selenium():
             "status": "error"
         })
 
+STARTUP_TIMINGS['app_import'] = round((time.perf_counter() - _MODULE_START) * 1000, 1)
+print(f"⏱  app import: {STARTUP_TIMINGS['app_import']:.1f} ms")
+
 if __name__ == '__main__':
+    # With debug=True the reloader re-runs this module in a child process;
+    # only warm up in the process that actually serves requests. Under
+    # gunicorn, gunicorn.conf.py starts the warm-up in each worker instead.
+    if WARMUP_ON_START and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_warmup()
+
     # Make sure to set the host to '0.0.0.0' to make it accessible
     # on your local network if you want to test from your phone.
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
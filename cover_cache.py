@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Content-addressed disk store of resized book covers.
+Each cover is fetched once, thumbnailed, and stored under the SHA-256 of
+the thumbnail so identical covers are only kept once.
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+import requests
+from PIL import Image
+
+from image_upload import scaled_size
+
+# Covers larger than this are not downloaded
+MAX_COVER_BYTES = 5 * 1024 * 1024
+
+# Valid names for files served from the store
+COVER_NAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.jpg$')
+
+
+class CoverCache:
+    def __init__(self, directory, max_side=300):
+        # Absolute, so files are found regardless of the working directory
+        # (Flask resolves relative send_file paths against the app root)
+        self.directory = os.path.abspath(directory)
+        self.max_side = max_side
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, digest):
+        """Path of a stored cover; files are fanned out by digest prefix."""
+        return os.path.join(self.directory, digest[:2], f"{digest}.jpg")
+
+    def has(self, digest):
+        return bool(digest) and os.path.exists(self.path_for(digest))
+
+    def fetch(self, image_url):
+        """
+        Download a cover, store a thumbnail of it and return its digest,
+        or None if the image could not be fetched or decoded.
+        """
+        if not image_url or not image_url.startswith(('http://', 'https://')):
+            return None
+        try:
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+                'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+            }
+            with requests.get(image_url, headers=headers, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                data = io.BytesIO()
+                for chunk in response.iter_content(64 * 1024):
+                    data.write(chunk)
+                    if data.tell() > MAX_COVER_BYTES:
+                        print(f"    > Cover too large, not caching: {image_url}")
+                        return None
+            data.seek(0)
+
+            image = Image.open(data)
+            image.draft('RGB', scaled_size(image.size, self.max_side))
+            image.thumbnail((self.max_side, self.max_side))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            thumbnail = io.BytesIO()
+            image.save(thumbnail, format='JPEG', quality=85, optimize=True)
+            content = thumbnail.getvalue()
+        except Exception as e:
+            print(f"    > Could not cache cover {image_url}: {e}")
+            return None
+
+        digest = hashlib.sha256(content).hexdigest()
+        self._store(digest, content)
+        print(f"    > Cached cover {image_url} as {digest[:12]}")
+        return digest
+
+    def _store(self, digest, content):
+        """Atomically write a cover unless it is already stored."""
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Local catalog of (title, author) -> Goodreads book ID.
+Lets popular books resolve offline, before any search engine is queried.
+"""
+
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+GOODREADS_BOOK_URL = "https://www.goodreads.com/book/show/{book_id}"
+
+# Matches the numeric book ID in a Goodreads /book/show/ URL
+BOOK_ID_PATTERN = re.compile(r'/book/show/(\d+)')
+
+# Leading articles are dropped so "The Hobbit" and "Hobbit" index the same
+LEADING_ARTICLES = ('the ', 'a ', 'an ')
+
+# Matching on the main title (subtitle dropped) is only a fallback, so its
+# confidence is scaled down
+SUBTITLE_FALLBACK_PENALTY = 0.9
+
+# Query trigrams are scanned rarest first; scanning stops once this many
+# postings have been visited, after at least MIN_TRIGRAMS_SCANNED trigrams.
+# Common trigrams (" th", "the") add little and have the longest lists.
+MAX_POSTINGS_SCANNED = 2000
+MIN_TRIGRAMS_SCANNED = 3
+
+# Only this many candidates (by shared trigram count) are scored exactly
+MAX_CANDIDATES = 20
+
+
+def normalize_text(text):
+    """
+    Normalize a title or author for matching: strip accents, series info in
+    parentheses, punctuation and leading articles, and collapse whitespace.
+    """
+    if not text or text == "Unknown":
+        return ""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.lower()
+    text = re.sub(r'\([^)]*\)', ' ', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = ' '.join(text.split())
+    for article in LEADING_ARTICLES:
+        if text.startswith(article):
+            text = text[len(article):]
+            break
+    return text
+
+
+def title_forms(title):
+    """
+    Return the (full, main) normalized forms of a title. The main title
+    drops any subtitle after a colon and equals the full title otherwise.
+    """
+    full = normalize_text(title)
+    main = normalize_text(title.split(':', 1)[0]) if title and ':' in title else full
+    return full, main or full
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a normalized string."""
+    if not text:
+        return set()
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient between the trigram sets of two normalized strings."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def title_similarity(forms_a, forms_b):
+    """
+    Similarity of two titles given as title_forms() tuples. Main titles are
+    also compared, at reduced confidence, when exactly one side has a
+    subtitle: "Shoe Dog: A Memoir" may match "Shoe Dog", but "Star Wars:
+    Thrawn" does not match "Star Wars: Heir to the Empire".
+    """
+    (full_a, main_a), (full_b, main_b) = forms_a, forms_b
+    score = similarity(full_a, full_b)
+    if (main_a != full_a) != (main_b != full_b):
+        score = max(score, similarity(main_a, main_b) * SUBTITLE_FALLBACK_PENALTY)
+    return score
+
+
+def containment(needle, haystack):
+    """
+    Fraction of the needle's trigrams found in the haystack. Unlike
+    similarity(), extra text around the needle does not lower the score.
+    """
+    grams_needle, grams_haystack = trigrams(needle), trigrams(haystack)
+    if not grams_needle or not grams_haystack:
+        return 0.0
+    return len(grams_needle & grams_haystack) / len(grams_needle)
+
+
+def match_confidence(title, author, candidate_title, candidate_author):
+    """
+    Score how well a candidate (title, author) matches the requested one.
+    Titles are title_forms() tuples and authors normalized strings.
+    Returns a value in [0, 1].
+    """
+    title_score = title_similarity(title, candidate_title)
+    if not author or not candidate_author:
+        # Without an author to confirm, a title match alone is less certain
+        return title_score * 0.9
+    author_score = similarity(author, candidate_author)
+    return 0.75 * title_score + 0.25 * author_score
+
+
+def extract_book_id(url):
+    """Return the Goodreads book ID from a /book/show/ URL, or None."""
+    if not url:
+        return None
+    match = BOOK_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path + ".lock", shared by all processes."""
+    with open(f"{path}.lock", 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class GoodreadsIndex:
+    """
+    In-memory trigram inverted index over known books, persisted as JSON.
+    Several processes may share one file: save() merges what others wrote.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = []
+        self.keys = {}
+        self.postings = {}
+        # Keys added or changed here since the last save
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _read_records(self):
+        """Read the records stored at self.path ([] if there are none)."""
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"    > Could not load Goodreads index from {self.path}: {e}")
+            return []
+
+    def _merge_records(self, records):
+        """Insert records read from disk, keeping local unsaved changes."""
+        for record in records:
+            self._insert(record['title'], record.get('author'), record['book_id'], from_disk=True)
+
+    def load(self):
+        """Load entries from the JSON file at self.path."""
+        self._merge_records(self._read_records())
+        print(f"Loaded {len(self.entries)} books into the Goodreads index")
+
+    def save(self):
+        """
+        Atomically write all entries to the JSON file at self.path. Entries
+        saved by other processes since we loaded are merged in first, under
+        a file lock, so concurrent workers never drop each other's entries.
+        """
+        if not self.path:
+            return
+        with self.save_lock, file_lock(self.path):
+            self._merge_records(self._read_records())
+            with self.lock:
+                records = [
+                    {'title': e['title'], 'author': e['author'], 'book_id': e['book_id']}
+                    for e in self.entries
+                ]
+                self.dirty.clear()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.path)
+
+    def _insert(self, title, author, book_id, from_disk=False):
+        """
+        Insert or update an entry. Returns True if the index changed.
+        Records from disk never overwrite changes that are not saved yet.
+        """
+        norm_title, norm_main = title_forms(title)
+        norm_author = normalize_text(author)
+        if not norm_title or not book_id:
+            return False
+        book_id = str(book_id)
+        key = (norm_title, norm_author)
+        with self.lock:
+            if from_disk and key in self.dirty:
+                return False
+            if not from_disk:
+                self.dirty.add(key)
+            existing = self.keys.get(key)
+            if existing is not None:
+                if self.entries[existing]['book_id'] == book_id:
+                    return False
+                self.entries[existing]['book_id'] = book_id
+                return True
+            entry_id = len(self.entries)
+            self.entries.append({
+                'title': title,
+                'author': author,
+                'book_id': book_id,
+                'norm_title': norm_title,
+                'norm_main': norm_main,
+                'norm_author': norm_author,
+            })
+            self.keys[key] = entry_id
+            for gram in trigrams(norm_title):
+                self.postings.setdefault(gram, []).append(entry_id)
+        return True
+
+    def add(self, title, author, goodreads_url, persist=True):
+        """Record a resolved (title, author) -> Goodreads URL mapping."""
+        book_id = extract_book_id(goodreads_url)
+        if not book_id:
+            return False
+        changed = self._insert(title, author, book_id)
+        if changed and persist:
+            self.save()
+        return changed
+
+    def lookup(self, title, author):
+        """
+        Find the best matching book. Returns (goodreads_url, confidence),
+        or (None, 0.0) if nothing in the index shares a trigram with the title.
+        """
+        norm_title, norm_main = title_forms(title)
+        norm_author = normalize_text(author)
+        query_grams = trigrams(norm_title)
+        if not query_grams:
+            return None, 0.0
+
+        with self.lock:
+            # Exact (title, author) matches need no fuzzy scan
+            entry_id = self.keys.get((norm_title, norm_author))
+            if entry_id is not None:
+                return GOODREADS_BOOK_URL.format(book_id=self.entries[entry_id]['book_id']), 1.0
+
+            postings = sorted(
+                (self.postings[gram] for gram in query_grams if gram in self.postings),
+                key=len
+            )
+            shared = Counter()
+            scanned = 0
+            for used, posting in enumerate(postings):
+                if used >= MIN_TRIGRAMS_SCANNED and scanned + len(posting) > MAX_POSTINGS_SCANNED:
+                    break
+                shared.update(posting)
+                scanned += len(posting)
+
+            best_entry, best_score = None, 0.0
+            for entry_id, _ in shared.most_common(MAX_CANDIDATES):
+                entry = self.entries[entry_id]
+                score = match_confidence((norm_title, norm_main), norm_author,
+                                         (entry['norm_title'], entry['norm_main']),
+                                         entry['norm_author'])
+                if score > best_score:
+                    best_entry, best_score = entry, score
+
+        if best_entry is None:
+            return None, 0.0
+        return GOODREADS_BOOK_URL.format(book_id=best_entry['book_id']), round(best_score, 3)
+
+    def import_goodreads_csv(self, csv_path):
+        """
+        Import a Goodreads library export ("Book Id", "Title", "Author" columns).
+        Returns the number of new or updated entries.
+        """
+        imported = 0
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                if self._insert(row.get('Title'), row.get('Author'), row.get('Book Id')):
+                    imported += 1
+        if imported:
+            self.save()
+        print(f"Imported {imported} books from {csv_path}")
+        return imported
+
+
+if __name__ == '__main__':
+    # Usage: python goodreads_index.py <goodreads_library_export.csv> [index.json]
+    if len(sys.argv) < 2:
+        print("Usage: python goodreads_index.py <goodreads_library_export.csv> [index.json]")
+        sys.exit(1)
+    index_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("GOODREADS_INDEX_PATH", "goodreads_index.json")
+    GoodreadsIndex(index_path).import_goodreads_csv(sys.argv[1])
@@ -0,0 +1,11 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from
+this directory, e.g. `gunicorn -w 4 -b 0.0.0.0:5000 app:app`.
+"""
+
+
+def post_worker_init(worker):
+    """Warm up Gemini and the Selenium browser in each worker once it has loaded the app."""
+    from app import WARMUP_ON_START, start_background_warmup
+    if WARMUP_ON_START:
+        start_background_warmup()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Memory-bounded handling of uploaded images: uploads spool to disk past a
+threshold, oversized images are rejected from their header alone, and
+JPEGs are decoded at reduced resolution so only the pixels needed for
+extraction are ever held in memory.
+"""
+
+import os
+import re
+import threading
+from tempfile import SpooledTemporaryFile
+
+from flask import Request
+from PIL import Image
+
+_heif_registered = False
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an uploaded image has more pixels than allowed."""
+
+
+def make_request_class(spool_bytes):
+    """
+    Return a Flask Request class whose uploaded files are kept in memory
+    only up to spool_bytes and written to a temporary file beyond that.
+    """
+
+    class SpooledUploadRequest(Request):
+        def _get_file_stream(self, total_content_length, content_type,
+                             filename=None, content_length=None):
+            return SpooledTemporaryFile(max_size=spool_bytes, mode='rb+')
+
+    return SpooledUploadRequest
+
+
+def register_heif_opener():
+    """Enable HEIC/HEIF decoding if the optional pillow-heif package is installed."""
+    global _heif_registered
+    if _heif_registered:
+        return
+    _heif_registered = True
+    try:
+        from pillow_heif import register_heif_opener as register
+    except ImportError:
+        return
+    register()
+
+
+def check_image_size(stream, max_pixels):
+    """
+    Read only the image header and reject images above max_pixels.
+    Returns (width, height) and rewinds the stream.
+    """
+    register_heif_opener()
+    with Image.open(stream) as image:
+        width, height = image.size
+    stream.seek(0)
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height} pixels); the limit is {max_pixels} pixels."
+        )
+    return width, height
+
+
+def scaled_size(size, max_side):
+    """
+    Size with the same aspect ratio whose longest side is max_side (or the
+    original size if it is already smaller). draft() only reduces the
+    scale while both sides stay above the requested box, so the box must
+    keep the image's aspect ratio.
+    """
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def load_image_for_extraction(stream, max_side):
+    """
+    Decode an image so that its longest side is at most max_side. JPEGs use
+    draft mode, which decodes directly at 1/2, 1/4 or 1/8 scale instead of
+    materializing the full-resolution bitmap first.
+    """
+    register_heif_opener()
+    image = Image.open(stream)
+    full_size = image.size
+    image.draft('RGB', scaled_size(full_size, max_side))
+    image.thumbnail((max_side, max_side))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    decoded_bytes = image.width * image.height * len(image.getbands())
+    print(f"    > Decoded image {full_size[0]}x{full_size[1]} at {image.width}x{image.height} "
+          f"({decoded_bytes / (1024 * 1024):.1f} MB)")
+    return image
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+# How often RSS is sampled when the kernel high-water mark cannot be used
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def _read_vm_hwm_mb():
+    """Peak RSS of this process since the last reset (VmHWM) in MB, or None."""
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(r'^VmHWM:\s+(\d+) kB', f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) / 1024 if match else None
+
+
+def _reset_vm_hwm():
+    """Reset VmHWM to the current RSS (Linux 4.0+). Returns True on success."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+class RequestMemoryTracker:
+    """
+    Measure the peak RSS reached while a block of code runs:
+
+        with RequestMemoryTracker() as tracker:
+            ...
+        tracker.peak_mb, tracker.peak_delta_mb
+
+    The kernel high-water mark is reset on entry and read on exit, which
+    catches short spikes. It is process-wide, so it is only used while a
+    single tracker is active; overlapping requests fall back to sampling
+    RSS from a background thread.
+    """
+
+    _lock = threading.Lock()
+    _active = 0
+    # Bumped whenever a tracker starts, so an exclusive tracker can tell
+    # whether another one overlapped it
+    _generation = 0
+
+    def __init__(self):
+        self.baseline_mb = None
+        self.peak_mb = None
+        self._sampled_peak_mb = None
+        self._use_hwm = False
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        with RequestMemoryTracker._lock:
+            RequestMemoryTracker._active += 1
+            RequestMemoryTracker._generation += 1
+            self._generation = RequestMemoryTracker._generation
+            self._use_hwm = RequestMemoryTracker._active == 1 and _reset_vm_hwm()
+        self.baseline_mb = current_rss_mb()
+        self._sampled_peak_mb = self.baseline_mb
+        if self.baseline_mb is not None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        with RequestMemoryTracker._lock:
+            RequestMemoryTracker._active -= 1
+            # Read under the lock so a tracker starting now cannot reset it first
+            exclusive = self._use_hwm and RequestMemoryTracker._generation == self._generation
+            hwm = _read_vm_hwm_mb() if exclusive else None
+        peaks = [self._sampled_peak_mb, hwm]
+        peaks = [peak for peak in peaks if peak is not None]
+        self.peak_mb = max(peaks) if peaks else None
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            rss = current_rss_mb()
+            if rss is not None and rss > self._sampled_peak_mb:
+                self._sampled_peak_mb = rss
+
+    @property
+    def peak_delta_mb(self):
+        """How far RSS rose above its level when the tracker started."""
+        if self.peak_mb is None or self.baseline_mb is None:
+            return None
+        return max(0.0, self.peak_mb - self.baseline_mb)
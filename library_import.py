@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Streaming readers for library exports (Goodreads CSV, generic CSV, JSON).
+Rows are yielded one at a time so imports run in constant memory.
+"""
+
+import csv
+import io
+import json
+import re
+
+from goodreads_index import GOODREADS_BOOK_URL, extract_book_id
+
+GOODREADS_ISBN_URL = "https://www.goodreads.com/book/isbn/{isbn}"
+
+# Column names accepted for each field, compared case-insensitively.
+# Goodreads exports use "Book Id", "Title", "Author", "ISBN", "ISBN13"
+# and "Exclusive Shelf".
+FIELD_ALIASES = {
+    'book_id': ('book id', 'book_id', 'goodreads_id', 'goodreads book id'),
+    'url': ('goodreads_url', 'url', 'link'),
+    'isbn13': ('isbn13',),
+    'isbn': ('isbn', 'isbn10'),
+    'title': ('title',),
+    'author': ('author', 'authors'),
+    'shelf': ('exclusive shelf', 'shelf'),
+}
+
+# Size of the chunks read when streaming a JSON array
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def clean_isbn(value):
+    """
+    Strip spreadsheet quoting (Goodreads exports ISBNs as ="0123456789")
+    and separators. Returns None unless a 10 or 13 character ISBN remains.
+    """
+    if not value:
+        return None
+    isbn = re.sub(r'[^0-9Xx]', '', str(value)).upper()
+    return isbn if len(isbn) in (10, 13) else None
+
+
+def normalize_row(raw):
+    """
+    Map a CSV/JSON row onto book_id, url, isbn, title, author and shelf.
+    Accepts a bare string or number (URL, ISBN or book ID) as a row too.
+    Anything else becomes a row without an ID or ISBN, so it is reported
+    as skipped rather than silently dropped.
+    """
+    if isinstance(raw, int) and not isinstance(raw, bool):
+        raw = str(raw)
+    if isinstance(raw, str):
+        value = raw.strip()
+        if 'goodreads.com' in value:
+            raw = {'url': value}
+        elif value.isdigit() and len(value) not in (10, 13):
+            raw = {'book_id': value}
+        else:
+            raw = {'isbn': value}
+    if not isinstance(raw, dict):
+        raw = {}
+
+    lowered = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+    row = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            value = lowered.get(alias)
+            if value not in (None, ''):
+                row[field] = str(value).strip()
+                break
+
+    isbn = clean_isbn(row.pop('isbn13', None)) or clean_isbn(row.get('isbn'))
+    row['isbn'] = isbn
+    book_id = row.get('book_id')
+    row['book_id'] = book_id if book_id and book_id.isdigit() else extract_book_id(row.get('url'))
+    return row
+
+
+def goodreads_url_for_row(row):
+    """
+    Return a Goodreads URL for a normalized row without searching, or None
+    if the row has neither a book ID nor an ISBN.
+    """
+    if row.get('book_id'):
+        return GOODREADS_BOOK_URL.format(book_id=row['book_id'])
+    if row.get('isbn'):
+        return GOODREADS_ISBN_URL.format(isbn=row['isbn'])
+    return None
+
+
+def iter_csv_rows(text_stream):
+    """Yield rows of a CSV file as dictionaries."""
+    yield from csv.DictReader(text_stream)
+
+
+def iter_json_rows(text_stream):
+    """
+    Yield the items of a JSON array, or of JSON Lines, without loading the
+    whole document. Items are decoded one at a time as chunks arrive.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        # Skip array brackets, separators and whitespace between items
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = text_stream.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                return
+            buffer = chunk
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = text_stream.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            buffer += chunk
+            continue
+        if end == len(buffer) and not eof:
+            # A scalar at the end of a chunk may continue in the next one
+            chunk = text_stream.read(JSON_CHUNK_SIZE)
+            if chunk:
+                buffer += chunk
+                continue
+            eof = True
+        buffer = buffer[end:]
+        yield item
+
+
+def iter_library_rows(binary_stream, filename=''):
+    """
+    Yield normalized rows from an uploaded library export. JSON and JSON
+    Lines are detected by extension, everything else is read as CSV.
+    """
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if filename.lower().endswith(('.json', '.jsonl', '.ndjson')):
+        raw_rows = iter_json_rows(text_stream)
+    else:
+        raw_rows = iter_csv_rows(text_stream)
+    for raw in raw_rows:
+        yield normalize_row(raw)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+State shared between worker processes: result caches, per-provider rate
+limits and an in-flight table so that only one worker calls upstream for
+the same key at a time. SingleFlight does the same for threads within a
+process.
+
+SQLite (a local file) is used by default; set SHARED_BACKEND_URL to a
+redis:// URL to share state between hosts (requires the redis package).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+# How often a waiting worker checks whether another worker has finished
+INFLIGHT_POLL_INTERVAL = 0.2
+
+# Fraction of SQLite writes that also delete expired cache entries
+PURGE_PROBABILITY = 0.01
+
+
+class SharedBackend:
+    """
+    Base class for shared backends. Subclasses implement the storage
+    primitives; caching, rate limiting and coalescing are built on top.
+    """
+
+    def get(self, namespace, key):
+        """Return (hit, value) for a cached entry."""
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, ttl):
+        """Cache a JSON-serializable value for ttl seconds."""
+        raise NotImplementedError
+
+    def reserve_slot(self, provider, interval):
+        """
+        Reserve the next request slot for a provider, spacing slots at
+        least interval seconds apart. Returns how long to wait (seconds).
+        """
+        raise NotImplementedError
+
+    def claim(self, key, owner, ttl):
+        """Mark key as in flight for owner. Returns False if already claimed."""
+        raise NotImplementedError
+
+    def release(self, key, owner):
+        """Clear an in-flight claim held by owner."""
+        raise NotImplementedError
+
+    def wait_for_slot(self, provider, interval):
+        """Block until this process may send the next request to provider."""
+        delay = self.reserve_slot(provider, interval)
+        if delay > 0:
+            time.sleep(delay)
+
+    def cached_call(self, namespace, key, fn, ttl, negative_ttl=None, inflight_ttl=120):
+        """
+        Return the cached result for (namespace, key), or compute it with fn().
+        If another worker is already computing the same key, wait for its
+        result instead of calling upstream again. None results are cached
+        for negative_ttl seconds (defaults to ttl).
+        """
+        hit, value = self.get(namespace, key)
+        if hit:
+            return value
+
+        inflight_key = f"{namespace}:{key}"
+        owner = f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex}"
+        deadline = time.time() + inflight_ttl
+        while not self.claim(inflight_key, owner, inflight_ttl):
+            time.sleep(INFLIGHT_POLL_INTERVAL)
+            hit, value = self.get(namespace, key)
+            if hit:
+                return value
+            if time.time() > deadline:
+                # The other worker is stuck; stop waiting and do the work
+                break
+
+        try:
+            # Another worker may have finished between our get() and claim()
+            hit, value = self.get(namespace, key)
+            if hit:
+                return value
+            value = fn()
+            if value is not None:
+                self.set(namespace, key, value, ttl)
+            elif negative_ttl != 0:
+                self.set(namespace, key, None, negative_ttl or ttl)
+            return value
+        finally:
+            self.release(inflight_key, owner)
+
+
+class SQLiteBackend(SharedBackend):
+    """
+    Shared backend stored in a local SQLite file. Works across processes
+    on the same host (e.g. several gunicorn workers).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT, key TEXT, value TEXT, expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (provider TEXT PRIMARY KEY, next_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS inflight (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+        self.purge_expired()
+
+    def _connect(self):
+        """Return this thread's connection (sqlite3 connections are per-thread)."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self.local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl)
+        )
+        if random.random() < PURGE_PROBABILITY:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired cache entries so the database does not grow without bound."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM inflight WHERE expires_at <= ?", (now,))
+
+    def reserve_slot(self, provider, interval):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT next_at FROM rate_limits WHERE provider = ?", (provider,)).fetchone()
+            start = max(now, row[0] if row else 0.0)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (provider, next_at) VALUES (?, ?)",
+                (provider, start + interval)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return start - now
+
+    def claim(self, key, owner, ttl):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            conn.execute("DELETE FROM inflight WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO inflight (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + ttl)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        self._connect().execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, owner))
+
+
+class RedisBackend(SharedBackend):
+    """
+    Shared backend stored in Redis, for workers spread over several hosts.
+    """
+
+    # Atomically read and advance a provider's next free slot
+    RESERVE_SLOT_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local next_at = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local start = math.max(now, next_at)
+    redis.call('SET', KEYS[1], tostring(start + interval), 'EX', math.ceil(start - now + interval) + 60)
+    return tostring(start - now)
+    """
+
+    # Delete an in-flight claim only if we still own it
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url, prefix='peerlist:'):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.reserve_slot_script = self.redis.register_script(self.RESERVE_SLOT_SCRIPT)
+        self.release_script = self.redis.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, namespace, key):
+        raw = self.redis.get(f"{self.prefix}cache:{namespace}:{key}")
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, namespace, key, value, ttl):
+        self.redis.set(f"{self.prefix}cache:{namespace}:{key}", json.dumps(value), ex=max(1, int(ttl)))
+
+    def reserve_slot(self, provider, interval):
+        delay = self.reserve_slot_script(keys=[f"{self.prefix}rate:{provider}"], args=[time.time(), interval])
+        return float(delay)
+
+    def claim(self, key, owner, ttl):
+        return bool(self.redis.set(f"{self.prefix}inflight:{key}", owner, nx=True, ex=max(1, int(ttl))))
+
+    def release(self, key, owner):
+        self.release_script(keys=[f"{self.prefix}inflight:{key}"], args=[owner])
+
+
+def create_backend(url=None, default_path='shared_state.db'):
+    """
+    Create a backend from a URL: redis://... for Redis, sqlite:///path for
+    a specific SQLite file, or empty for SQLite at default_path.
+    """
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    if url and url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url:
+        raise ValueError(f"Unsupported SHARED_BACKEND_URL: {url}")
+    return SQLiteBackend(default_path)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key within one process: the
+    first caller runs the function, later callers wait on its future.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already in flight."""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
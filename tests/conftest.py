@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """The Flask app module, with its shared state, index and covers under tmp_path."""
+    monkeypatch.setenv('GOOGLE_API_KEY', os.getenv('GOOGLE_API_KEY', 'test-key'))
+    import app
+    from goodreads_index import GoodreadsIndex
+    from shared_state import SQLiteBackend
+    monkeypatch.setattr(app, 'shared_backend', SQLiteBackend(str(tmp_path / "shared.db")))
+    monkeypatch.setattr(app, 'goodreads_index', GoodreadsIndex(str(tmp_path / "goodreads_index.json")))
+    monkeypatch.setattr(app, 'cover_cache', None)
+    monkeypatch.setattr(app, 'COVER_CACHE_DIR', str(tmp_path / "covers"))
+    return app
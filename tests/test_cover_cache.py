@@ -0,0 +1,144 @@
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+import cover_cache
+from cover_cache import COVER_NAME_PATTERN, CoverCache
+
+GOODREADS_URL = 'https://www.goodreads.com/book/show/234225'
+IMAGE_URL = 'https://images.example.com/dune.jpg'
+
+
+class FakeResponse:
+    def __init__(self, content, status=200):
+        self.content = content
+        self.status = status
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise cover_cache.requests.HTTPError(f"{self.status} error")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+def jpeg_bytes(size):
+    data = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(data, format='JPEG')
+    return data.getvalue()
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """Serve fixed bytes for every cover download and record the URLs fetched."""
+    fetched = []
+
+    def serve(content, status=200):
+        def fake_get(url, **kwargs):
+            fetched.append(url)
+            return FakeResponse(content, status)
+        monkeypatch.setattr(cover_cache.requests, 'get', fake_get)
+        return fetched
+
+    return serve
+
+
+def test_fetch_stores_thumbnail_under_content_hash(tmp_path, served):
+    served(jpeg_bytes((1200, 1800)))
+    cache = CoverCache(str(tmp_path), max_side=300)
+
+    digest = cache.fetch(IMAGE_URL)
+
+    assert cache.has(digest)
+    with open(cache.path_for(digest), 'rb') as f:
+        content = f.read()
+    assert hashlib.sha256(content).hexdigest() == digest
+    assert Image.open(io.BytesIO(content)).size == (200, 300)
+
+
+def test_identical_covers_are_stored_once(tmp_path, served):
+    served(jpeg_bytes((400, 600)))
+    cache = CoverCache(str(tmp_path))
+    assert cache.fetch(IMAGE_URL) == cache.fetch('https://mirror.example.com/dune.jpg')
+
+
+def test_fetch_rejects_oversized_covers(tmp_path, served, monkeypatch):
+    monkeypatch.setattr(cover_cache, 'MAX_COVER_BYTES', 1024)
+    served(jpeg_bytes((1000, 1000)) + b'\0' * 4096)
+    assert CoverCache(str(tmp_path)).fetch(IMAGE_URL) is None
+
+
+def test_fetch_returns_none_for_undecodable_or_failed_downloads(tmp_path, served):
+    cache = CoverCache(str(tmp_path))
+    served(b'<html>not an image</html>')
+    assert cache.fetch(IMAGE_URL) is None
+    served(b'', status=404)
+    assert cache.fetch(IMAGE_URL) is None
+
+
+def test_fetch_ignores_non_http_urls(tmp_path, served):
+    fetched = served(jpeg_bytes((10, 10)))
+    cache = CoverCache(str(tmp_path))
+    assert cache.fetch('') is None
+    assert cache.fetch('file:///etc/passwd') is None
+    assert fetched == []
+
+
+def test_directory_is_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert CoverCache('covers').directory == str(tmp_path / 'covers')
+
+
+def test_cover_name_pattern():
+    assert COVER_NAME_PATTERN.match('a' * 64 + '.jpg')
+    assert not COVER_NAME_PATTERN.match('A' * 64 + '.jpg')
+    assert not COVER_NAME_PATTERN.match('a' * 63 + '.jpg')
+    assert not COVER_NAME_PATTERN.match('../' + 'a' * 61 + '.jpg')
+
+
+def test_cover_route_fetches_once_and_serves_immutable_file(app_module, served, tmp_path, monkeypatch):
+    # A relative cache directory must work when the cwd is not the app root
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'COVER_CACHE_DIR', 'covers')
+    fetched = served(jpeg_bytes((400, 600)))
+    app_module.get_shared_backend().set(
+        'metadata', app_module.metadata_key(GOODREADS_URL), {'image': IMAGE_URL}, 60
+    )
+    client = app_module.app.test_client()
+
+    link = app_module.cover_link(GOODREADS_URL)
+    assert link.startswith('/cover?goodreads_url=')
+    assert fetched == []
+
+    response = client.get(link)
+    assert response.status_code == 302
+    cover_path = response.headers['Location']
+    assert COVER_NAME_PATTERN.match(cover_path.rsplit('/', 1)[1])
+    assert fetched == [IMAGE_URL]
+
+    response = client.get(cover_path)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.headers['ETag'].strip('"') == cover_path.rsplit('/', 1)[1][:-len('.jpg')]
+
+    # Once stored, responses link straight to the file
+    assert app_module.cover_link(GOODREADS_URL) == cover_path
+    assert fetched == [IMAGE_URL]
+
+
+def test_cover_route_unknown_book(app_module):
+    client = app_module.app.test_client()
+    assert app_module.cover_link(GOODREADS_URL) is None
+    assert client.get(f'/cover?goodreads_url={GOODREADS_URL}').status_code == 404
+    assert client.get('/covers/' + 'a' * 64 + '.jpg').status_code == 404
+    assert client.get('/covers/not-a-digest.jpg').status_code == 404
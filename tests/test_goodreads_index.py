@@ -0,0 +1,119 @@
+import time
+
+from goodreads_index import (
+    GoodreadsIndex, extract_book_id, normalize_text, similarity, title_forms
+)
+
+
+def make_index(books, path=None):
+    index = GoodreadsIndex(path)
+    for title, author, book_id in books:
+        index.add(title, author, f"https://www.goodreads.com/book/show/{book_id}", persist=False)
+    return index
+
+
+def test_normalize_text():
+    assert normalize_text("The Hobbit (Middle-earth, #0)") == "hobbit"
+    assert normalize_text("Café   Society!") == "cafe society"
+    assert normalize_text("Unknown") == ""
+
+
+def test_title_forms():
+    assert title_forms("Shoe Dog: A Memoir") == ("shoe dog a memoir", "shoe dog")
+    assert title_forms("Shoe Dog") == ("shoe dog", "shoe dog")
+
+
+def test_extract_book_id():
+    assert extract_book_id("https://www.goodreads.com/book/show/27220736-shoe-dog?ref=x") == "27220736"
+    assert extract_book_id("https://example.com/") is None
+
+
+def test_similarity_bounds():
+    assert similarity("dune", "dune") == 1.0
+    assert similarity("dune", "") == 0.0
+
+
+def test_exact_lookup():
+    index = make_index([("Shoe Dog", "Phil Knight", 1)])
+    assert index.lookup("Shoe Dog", "Phil Knight") == ("https://www.goodreads.com/book/show/1", 1.0)
+
+
+def test_series_titles_do_not_collide():
+    index = make_index([
+        ("Star Wars: Thrawn", "Timothy Zahn", 1),
+        ("Star Wars: Heir to the Empire", "Timothy Zahn", 2),
+    ])
+    assert len(index) == 2
+    assert index.lookup("Star Wars: Heir to the Empire", "Timothy Zahn")[0].endswith("/2")
+
+    url, confidence = index.lookup("Star Wars: Dark Force Rising", "Timothy Zahn")
+    assert confidence < 0.85
+
+
+def test_subtitle_fallback_has_reduced_confidence():
+    index = make_index([("Shoe Dog", "Phil Knight", 1)])
+    url, confidence = index.lookup("Shoe Dog: A Memoir by the Creator of Nike", "Phil Knight")
+    assert url.endswith("/1")
+    assert 0.85 <= confidence < 1.0
+
+
+def test_unrelated_title_has_low_confidence():
+    index = make_index([("Shoe Dog", "Phil Knight", 1)])
+    url, confidence = index.lookup("Dune", "Frank Herbert")
+    assert confidence < 0.5
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "index.json")
+    index = make_index([("Dune", "Frank Herbert", 234225)], path)
+    index.save()
+    assert GoodreadsIndex(path).lookup("Dune", "Frank Herbert")[0].endswith("/234225")
+
+
+def test_import_goodreads_csv(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text('Book Id,Title,Author\n234225,"Dune (Dune, #1)",Frank Herbert\n', encoding='utf-8')
+    index = GoodreadsIndex(str(tmp_path / "index.json"))
+    assert index.import_goodreads_csv(str(csv_path)) == 1
+    assert index.lookup("Dune", "Frank Herbert") == ("https://www.goodreads.com/book/show/234225", 1.0)
+
+
+def test_fuzzy_lookup_stays_fast_on_large_index():
+    index = GoodreadsIndex()
+    for n in range(20000):
+        index._insert(f"the book of {n} and the other {n * 7}", f"author {n}", n)
+    index._insert("The Name of the Wind", "Patrick Rothfuss", 999999)
+
+    start = time.perf_counter()
+    url, _ = index.lookup("Name of the Wind (Kingkiller Chronicle, #1)", "Patrick Rothfus")
+    elapsed = time.perf_counter() - start
+
+    assert url.endswith("/999999")
+    assert elapsed < 0.01
+
+
+def test_concurrent_writers_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "index.json")
+    worker_a = GoodreadsIndex(path)
+    worker_b = GoodreadsIndex(path)
+
+    worker_a.add("Dune", "Frank Herbert", "https://www.goodreads.com/book/show/1")
+    worker_b.add("Shoe Dog", "Phil Knight", "https://www.goodreads.com/book/show/2")
+
+    reloaded = GoodreadsIndex(path)
+    assert len(reloaded) == 2
+    assert reloaded.lookup("Dune", "Frank Herbert")[0].endswith("/1")
+    assert reloaded.lookup("Shoe Dog", "Phil Knight")[0].endswith("/2")
+    # The later writer also picked up the earlier writer's entry
+    assert worker_b.lookup("Dune", "Frank Herbert")[0].endswith("/1")
+
+
+def test_unsaved_local_change_wins_over_disk(tmp_path):
+    path = str(tmp_path / "index.json")
+    worker_a = GoodreadsIndex(path)
+    worker_b = GoodreadsIndex(path)
+
+    worker_a.add("Dune", "Frank Herbert", "https://www.goodreads.com/book/show/1")
+    worker_b.add("Dune", "Frank Herbert", "https://www.goodreads.com/book/show/2")
+
+    assert GoodreadsIndex(path).lookup("Dune", "Frank Herbert")[0].endswith("/2")
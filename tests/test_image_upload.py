@@ -0,0 +1,129 @@
+import io
+import sys
+import threading
+
+import pytest
+from PIL import Image
+
+from image_upload import (
+    ImageTooLargeError, RequestMemoryTracker, check_image_size, load_image_for_extraction,
+    make_request_class, scaled_size
+)
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="reads /proc")
+
+ALLOCATION_MB = 100
+
+
+def jpeg(size):
+    data = io.BytesIO()
+    Image.new('RGB', size, 'white').save(data, format='JPEG')
+    data.seek(0)
+    return data
+
+
+def test_scaled_size_keeps_aspect_ratio():
+    assert scaled_size((8000, 6000), 2000) == (2000, 1500)
+    assert scaled_size((4000, 12000), 2000) == (667, 2000)
+    assert scaled_size((800, 600), 2000) == (800, 600)
+
+
+def test_check_image_size_rewinds_stream():
+    stream = jpeg((300, 200))
+    assert check_image_size(stream, 300 * 200) == (300, 200)
+    assert stream.tell() == 0
+
+
+def test_check_image_size_rejects_too_many_pixels():
+    with pytest.raises(ImageTooLargeError):
+        check_image_size(jpeg((300, 200)), 300 * 200 - 1)
+
+
+def test_request_class_spools_large_uploads_to_disk():
+    request_class = make_request_class(1024)
+    small = request_class._get_file_stream(None, 0, 'image/jpeg')
+    small.write(b'x' * 1024)
+    assert not small._rolled
+
+    large = request_class._get_file_stream(None, 0, 'image/jpeg')
+    large.write(b'x' * 1025)
+    assert large._rolled
+
+
+def test_extract_books_rejects_large_and_unreadable_images(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_IMAGE_PIXELS', 100 * 100)
+    client = app_module.app.test_client()
+
+    response = client.post('/extract_books', data={'file': (jpeg((101, 100)), 'shelf.jpg')})
+    assert response.status_code == 413
+    assert '10100 pixels' in response.get_json()['error']
+
+    response = client.post('/extract_books', data={'file': (io.BytesIO(b'not an image'), 'shelf.jpg')})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Could not read image: unsupported or corrupt image file."
+
+
+@pytest.mark.parametrize('size', [(8000, 6000), (12000, 4000)])
+def test_non_square_jpeg_is_decoded_at_reduced_scale(monkeypatch, size):
+    decoded_sizes = []
+    thumbnail = Image.Image.thumbnail
+
+    def record_thumbnail(image, *args, **kwargs):
+        # The size draft mode decoded at, before the final resize
+        decoded_sizes.append(image.size)
+        return thumbnail(image, *args, **kwargs)
+
+    monkeypatch.setattr(Image.Image, 'thumbnail', record_thumbnail)
+    image = load_image_for_extraction(jpeg(size), 2000)
+
+    assert decoded_sizes == [(size[0] // 4, size[1] // 4)]
+    assert max(image.size) == 2000
+
+
+def allocate_and_free():
+    data = bytearray(ALLOCATION_MB * 1024 * 1024)
+    data[::4096] = b'x' * len(data[::4096])
+    del data
+
+
+@linux_only
+def test_tracker_reports_peak_after_memory_is_freed():
+    with RequestMemoryTracker() as tracker:
+        allocate_and_free()
+    assert tracker.peak_delta_mb >= ALLOCATION_MB * 0.8
+
+
+@linux_only
+def test_tracker_ignores_earlier_peaks():
+    allocate_and_free()
+    with RequestMemoryTracker() as tracker:
+        pass
+    assert tracker.peak_delta_mb < ALLOCATION_MB * 0.5
+
+
+@linux_only
+def test_overlapping_trackers_fall_back_to_sampling():
+    started = threading.Event()
+    done = threading.Event()
+    results = {}
+
+    def other_request():
+        with RequestMemoryTracker() as tracker:
+            started.set()
+            done.wait()
+        results['other'] = tracker
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    started.wait()
+    with RequestMemoryTracker() as tracker:
+        data = bytearray(ALLOCATION_MB * 1024 * 1024)
+        data[::4096] = b'x' * len(data[::4096])
+        # Hold the memory long enough for the sampler to see it
+        threading.Event().wait(0.2)
+        del data
+    done.set()
+    thread.join()
+
+    assert tracker.peak_delta_mb >= ALLOCATION_MB * 0.8
+    assert results['other'].peak_mb is not None
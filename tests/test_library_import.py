@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+
+import pytest
+
+import library_import
+from library_import import (
+    clean_isbn, goodreads_url_for_row, iter_json_rows, iter_library_rows, normalize_row
+)
+
+
+def read_json(text):
+    return list(iter_json_rows(io.StringIO(text)))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Force items to be split across chunk boundaries
+    monkeypatch.setattr(library_import, 'JSON_CHUNK_SIZE', 5)
+
+
+def test_clean_isbn():
+    assert clean_isbn('="0441013597"') == '0441013597'
+    assert clean_isbn('978-0-441-01359-3') == '9780441013593'
+    assert clean_isbn('=""') is None
+    assert clean_isbn('12345') is None
+
+
+def test_normalize_goodreads_export_row():
+    row = normalize_row({
+        'Book Id': '234225',
+        'Title': 'Dune (Dune, #1)',
+        'Author': 'Frank Herbert',
+        'ISBN': '="0441013597"',
+        'ISBN13': '="9780441013593"',
+        'Exclusive Shelf': 'read',
+    })
+    assert row['book_id'] == '234225'
+    assert row['isbn'] == '9780441013593'
+    assert row['shelf'] == 'read'
+    assert goodreads_url_for_row(row) == 'https://www.goodreads.com/book/show/234225'
+
+
+def test_normalize_bare_strings():
+    url_row = normalize_row('https://www.goodreads.com/book/show/5-some-book')
+    assert url_row['book_id'] == '5'
+
+    isbn_row = normalize_row('0316769487')
+    assert isbn_row['book_id'] is None
+    assert goodreads_url_for_row(isbn_row) == 'https://www.goodreads.com/book/isbn/0316769487'
+
+
+def test_row_without_id_or_isbn_has_no_url():
+    row = normalize_row({'title': 'Dune'})
+    assert goodreads_url_for_row(row) is None
+
+
+def test_normalize_numbers():
+    isbn_row = normalize_row(9780441013593)
+    assert isbn_row['isbn'] == '9780441013593'
+    assert isbn_row['book_id'] is None
+
+    id_row = normalize_row(234225)
+    assert id_row['book_id'] == '234225'
+    assert goodreads_url_for_row(id_row) == 'https://www.goodreads.com/book/show/234225'
+
+    assert normalize_row('234225')['book_id'] == '234225'
+
+
+def test_unsupported_items_are_kept_without_url():
+    for raw in (None, True, 1.5, ['x']):
+        row = normalize_row(raw)
+        assert row == {'isbn': None, 'book_id': None}
+        assert goodreads_url_for_row(row) is None
+
+
+def test_iter_library_rows_json_numbers():
+    data = b'[9780441013593, 234225, null]'
+    rows = list(iter_library_rows(io.BytesIO(data), 'books.json'))
+    assert [goodreads_url_for_row(row) for row in rows] == [
+        'https://www.goodreads.com/book/isbn/9780441013593',
+        'https://www.goodreads.com/book/show/234225',
+        None,
+    ]
+
+
+def test_json_array_across_chunks(small_chunks):
+    items = [{'title': 'Dune', 'isbn': '9780441013593'}, 'https://www.goodreads.com/book/show/5', 12345]
+    assert read_json(json.dumps(items)) == items
+
+
+def test_json_lines(small_chunks):
+    text = '{"url": "https://www.goodreads.com/book/show/7"}\n{"title": "x"}\n'
+    assert read_json(text) == [{'url': 'https://www.goodreads.com/book/show/7'}, {'title': 'x'}]
+
+
+def test_empty_json():
+    assert read_json('') == []
+    assert read_json('[]') == []
+
+
+def test_malformed_json_raises(small_chunks):
+    with pytest.raises(json.JSONDecodeError):
+        read_json('[{"title": "Dune"}, {"title": ')
+
+
+def test_iter_library_rows_csv():
+    data = (
+        '﻿Book Id,Title,Author,ISBN,ISBN13\n'
+        '234225,"Dune (Dune, #1)",Frank Herbert,"=""0441013597""","=""9780441013593"""\n'
+    ).encode('utf-8')
+    rows = list(iter_library_rows(io.BytesIO(data), 'export.csv'))
+    assert len(rows) == 1
+    assert rows[0]['title'] == 'Dune (Dune, #1)'
+    assert rows[0]['book_id'] == '234225'
+
+
+def test_iter_library_rows_json():
+    data = json.dumps([{'goodreads_url': 'https://www.goodreads.com/book/show/9'}]).encode('utf-8')
+    rows = list(iter_library_rows(io.BytesIO(data), 'books.json'))
+    assert rows[0]['book_id'] == '9'
+
+
+def test_iter_library_rows_reports_bad_input():
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_library_rows(io.BytesIO(b'Title\n\xff\xfe\xfa\n'), 'export.csv'))
+
+    huge_field = 'Title\n"' + 'x' * (csv.field_size_limit() + 1) + '"\n'
+    with pytest.raises(csv.Error):
+        list(iter_library_rows(io.BytesIO(huge_field.encode('utf-8')), 'export.csv'))
+
+
+def test_import_library_reports_unresolved_isbns_as_failures(app_module, monkeypatch):
+    added = []
+
+    def resolve(url):
+        return None if url.endswith('0000000000') else 'https://www.goodreads.com/book/show/234225'
+
+    def add(title, author, goodreads_url):
+        added.append(goodreads_url)
+        return True, None
+
+    monkeypatch.setattr(app_module, 'resolve_goodreads_redirect', resolve)
+    monkeypatch.setattr(app_module, 'add_book_from_goodreads_url', add)
+    data = json.dumps(['9780441013593', '0000000000', 5, {'title': 'No identifiers'}]).encode('utf-8')
+
+    response = app_module.app.test_client().post(
+        '/import_library', data={'file': (io.BytesIO(data), 'books.json')}
+    )
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert [line['status'] for line in lines[:-1]] == ['added', 'failed', 'added', 'skipped']
+    summary = lines[-1]
+    assert summary['total_books'] == 4
+    assert summary['added_count'] == 2
+    assert summary['skipped_count'] == 1
+    assert summary['failed_books'] == ['https://www.goodreads.com/book/isbn/0000000000']
+    assert added == ['https://www.goodreads.com/book/show/234225', 'https://www.goodreads.com/book/show/5']
@@ -0,0 +1,77 @@
+import pytest
+
+
+@pytest.fixture
+def app(app_module):
+    return app_module
+
+
+def test_canonical_goodreads_url(app):
+    assert app.canonical_goodreads_url(
+        'https://www.goodreads.com/book/show/234225.Dune?from_search=true&qid=x#reviews'
+    ) == 'https://www.goodreads.com/book/show/234225.Dune'
+    assert app.canonical_goodreads_url(
+        '/url?q=https://www.goodreads.com/book/show/5-some-book&sa=U'
+    ) == 'https://www.goodreads.com/book/show/5-some-book'
+    assert app.canonical_goodreads_url('https://www.goodreads.com/author/show/58.Frank_Herbert') is None
+    assert app.canonical_goodreads_url('') is None
+
+
+def test_result_title_keeps_subtitle(app):
+    text = "Shoe Dog: A Memoir by the Creator of Nike by Phil Knight | Goodreads"
+    assert app.result_title(text, "Phil Knight") == "Shoe Dog: A Memoir by the Creator of Nike"
+    assert app.result_title("Dune by Frank Herbert", "") == "Dune"
+
+
+def test_exact_title_beats_sequel(app):
+    dune = app.score_candidate(
+        "Dune", "Frank Herbert",
+        'https://www.goodreads.com/book/show/234225.Dune', "Dune by Frank Herbert"
+    )
+    messiah = app.score_candidate(
+        "Dune", "Frank Herbert",
+        'https://www.goodreads.com/book/show/44492285-dune-messiah', "Dune Messiah by Frank Herbert"
+    )
+    assert dune > 0.9
+    assert messiah < dune - 0.2
+
+
+def test_summaries_are_penalized_unless_requested(app):
+    url = 'https://www.goodreads.com/book/show/1.Summary_of_Shoe_Dog'
+    text = "Summary of Shoe Dog by Phil Knight"
+    assert app.score_candidate("Shoe Dog", "Phil Knight", url, text) < app.MIN_CANDIDATE_SCORE
+    assert app.score_candidate("Summary of Shoe Dog", "Phil Knight", url, text) > 0.9
+
+
+def test_subtitle_in_result_text_still_matches(app):
+    score = app.score_candidate(
+        "Shoe Dog", "Phil Knight",
+        'https://www.goodreads.com/book/show/27220736-shoe-dog',
+        "Shoe Dog: A Memoir by the Creator of Nike by Phil Knight"
+    )
+    assert score >= app.MIN_CANDIDATE_SCORE
+
+
+def test_slug_only_candidate(app):
+    score = app.score_candidate(
+        "The Silent Patient", "Alex Michaelides",
+        'https://www.goodreads.com/book/show/40097951-the-silent-patient', ""
+    )
+    assert score > 0.9
+
+
+def test_pick_best_candidate_merges_and_ranks(app):
+    candidates = [
+        ('https://www.goodreads.com/book/show/44492285-dune-messiah?from_search=true', "Dune Messiah"),
+        ('https://www.goodreads.com/book/show/234225.Dune?from_search=true', "Dune"),
+        ('https://www.goodreads.com/book/show/234225.Dune?ac=1', "by Frank Herbert"),
+        ('https://www.goodreads.com/author/show/58.Frank_Herbert', "Frank Herbert"),
+    ]
+    assert app.pick_best_candidate("Dune", "Frank Herbert", candidates, 'test') == \
+        'https://www.goodreads.com/book/show/234225.Dune'
+
+
+def test_pick_best_candidate_rejects_weak_matches(app):
+    candidates = [('https://www.goodreads.com/book/show/3.Harry_Potter', "Harry Potter by J.K. Rowling")]
+    assert app.pick_best_candidate("Dune", "Frank Herbert", candidates, 'test') is None
+    assert app.pick_best_candidate("Dune", "Frank Herbert", [], 'test') is None
@@ -0,0 +1,169 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import shared_state
+from shared_state import SQLiteBackend, create_backend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "shared.db"))
+
+
+def test_get_and_set(backend):
+    assert backend.get('ns', 'key') == (False, None)
+    backend.set('ns', 'key', {'a': 1}, ttl=60)
+    assert backend.get('ns', 'key') == (True, {'a': 1})
+
+
+def test_expired_entries_are_misses(backend):
+    backend.set('ns', 'key', 'value', ttl=-1)
+    assert backend.get('ns', 'key') == (False, None)
+
+
+def test_claim_is_exclusive_until_released(backend):
+    assert backend.claim('k', 'owner-a', ttl=60)
+    assert not backend.claim('k', 'owner-b', ttl=60)
+    # Only the owner can release a claim
+    backend.release('k', 'owner-b')
+    assert not backend.claim('k', 'owner-b', ttl=60)
+    backend.release('k', 'owner-a')
+    assert backend.claim('k', 'owner-b', ttl=60)
+
+
+def test_expired_claim_can_be_taken_over(backend):
+    assert backend.claim('k', 'owner-a', ttl=-1)
+    assert backend.claim('k', 'owner-b', ttl=60)
+
+
+def test_reserve_slot_spaces_requests(backend):
+    assert backend.reserve_slot('google', 1.0) == 0
+    assert backend.reserve_slot('google', 1.0) == pytest.approx(1.0, abs=0.1)
+    assert backend.reserve_slot('google', 1.0) == pytest.approx(2.0, abs=0.1)
+    # Providers have separate buckets
+    assert backend.reserve_slot('duckduckgo', 1.0) == 0
+
+
+def test_cached_call_caches_results(backend):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return 'url'
+
+    assert backend.cached_call('ns', 'k', fn, ttl=60) == 'url'
+    assert backend.cached_call('ns', 'k', fn, ttl=60) == 'url'
+    assert len(calls) == 1
+
+
+def test_cached_call_negative_ttl(backend):
+    calls = []
+
+    def miss():
+        calls.append(1)
+        return None
+
+    backend.cached_call('ns', 'cached-miss', miss, ttl=60, negative_ttl=60)
+    backend.cached_call('ns', 'cached-miss', miss, ttl=60, negative_ttl=60)
+    assert len(calls) == 1
+
+    backend.cached_call('ns', 'uncached-miss', miss, ttl=60, negative_ttl=0)
+    backend.cached_call('ns', 'uncached-miss', miss, ttl=60, negative_ttl=0)
+    assert len(calls) == 3
+
+
+def test_cached_call_does_not_cache_errors(backend):
+    def fail():
+        raise RuntimeError("blocked")
+
+    with pytest.raises(RuntimeError):
+        backend.cached_call('ns', 'k', fail, ttl=60)
+    assert backend.get('ns', 'k') == (False, None)
+    # The in-flight claim was released
+    assert backend.cached_call('ns', 'k', lambda: 'url', ttl=60) == 'url'
+
+
+def test_cached_call_coalesces_threads(backend):
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.5)
+        return 'url'
+
+    threads = [
+        threading.Thread(target=lambda: results.append(backend.cached_call('ns', 'k', slow, ttl=60)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['url'] * 4
+    assert len(calls) == 1
+
+
+def _resolve_in_worker(path, counter):
+    def slow():
+        with counter.get_lock():
+            counter.value += 1
+        time.sleep(0.5)
+        return 'url'
+    return SQLiteBackend(path).cached_call('ns', 'k', slow, ttl=60)
+
+
+def test_cached_call_coalesces_processes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SQLiteBackend(path)
+    counter = multiprocessing.Value('i', 0)
+    workers = [
+        multiprocessing.Process(target=_resolve_in_worker, args=(path, counter))
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert counter.value == 1
+
+
+def test_create_backend(tmp_path):
+    assert isinstance(create_backend('', str(tmp_path / "a.db")), SQLiteBackend)
+    assert isinstance(create_backend(f"sqlite:///{tmp_path / 'b.db'}"), SQLiteBackend)
+    with pytest.raises(ValueError):
+        create_backend('memcached://localhost')
+
+
+def count_rows(backend, table):
+    return backend._connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_purge_expired_deletes_only_expired_rows(backend):
+    backend.set('ns', 'old', 'value', ttl=-1)
+    backend.set('ns', 'fresh', 'value', ttl=60)
+    backend.claim('stale', 'owner', ttl=-1)
+
+    backend.purge_expired()
+
+    assert count_rows(backend, 'cache') == 1
+    assert count_rows(backend, 'inflight') == 0
+    assert backend.get('ns', 'fresh') == (True, 'value')
+
+
+def test_expired_rows_are_purged_on_write_and_startup(backend, monkeypatch):
+    monkeypatch.setattr(shared_state, 'PURGE_PROBABILITY', 1.0)
+    backend.set('ns', 'old', 'value', ttl=-1)
+    backend.set('ns', 'new', 'value', ttl=60)
+    assert count_rows(backend, 'cache') == 1
+
+    monkeypatch.setattr(shared_state, 'PURGE_PROBABILITY', 0.0)
+    backend.set('ns', 'old', 'value', ttl=-1)
+    assert count_rows(backend, 'cache') == 2
+    assert count_rows(SQLiteBackend(backend.path), 'cache') == 1
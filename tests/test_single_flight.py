@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from shared_state import SingleFlight
+
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.3)
+        return 'result'
+
+    run_concurrently(5, lambda: results.append(flight.do('key', slow)))
+
+    assert results == ['result'] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+    assert flight.calls == {}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+def test_key_is_cleared_after_call():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('key', fn) == 1
+    assert flight.do('key', fn) == 2
+
+
+def test_exception_reaches_all_waiters():
+    flight = SingleFlight()
+    errors = []
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.3)
+        raise RuntimeError("upstream down")
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    run_concurrently(3, call)
+    leader.join()
+
+    assert errors == ["upstream down"] * 4
+    assert flight.coalesced == 3
+    assert flight.calls == {}
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)